@@ -1,97 +1,260 @@
-from flask import Flask, jsonify, request
+from flask import Flask, current_app, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import orjson
 import requests
-from datetime import datetime, timedelta
-from collections import defaultdict
-import statistics
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby, islice
+from operator import attrgetter, itemgetter
+import logging
+import os
+import threading
+import numpy as np
+from cachetools import LRUCache, TTLCache
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Route jsonify() through orjson, which is far faster on big lists of dicts"""
+
+    @staticmethod
+    def default(o):
+        # Namedtuple records such as DrainEvent are emitted as JSON objects
+        if isinstance(o, tuple) and hasattr(o, '_asdict'):
+            return o._asdict()
+        return DefaultJSONProvider.default(o)
+
+    # NumPy scalars and arrays from the analysis code serialize natively
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response rather than decoding
+        # them to str for Flask to encode again. Same argument handling as
+        # jsonify(): one positional value, several as a list, or keywords
+        if args and kwargs:
+            raise TypeError("app.json.response() takes either args or kwargs, not both")
+        obj = (args[0] if len(args) == 1 else list(args)) if args else (kwargs or None)
+        body = orjson.dumps(obj, default=self.default, option=self.option | orjson.OPT_APPEND_NEWLINE)
+        return current_app.response_class(body, mimetype=self.mimetype)
+
 
 app = Flask(__name__)
-CORS(app)
+app.json = ORJSONProvider(app)
+
+# The dashboard normally reaches the API through the Vite dev proxy, so only
+# its own origins need CORS; set CORS_ORIGINS (comma separated) for others.
+# Preflight results are cacheable by the browser for a day
+CORS_ORIGINS = os.environ.get(
+    "CORS_ORIGINS",
+    "http://localhost:5173,http://127.0.0.1:5173,http://localhost:3000",
+).split(",")
+CORS(app, resources={r"/api/*": {"origins": CORS_ORIGINS}}, max_age=86400, send_wildcard=False)
+
+logger = logging.getLogger(__name__)
 
 BASE_URL = "https://hackutd2025.eog.systems/api"
 
-cache = {}
+@lru_cache(maxsize=128)
+def upstream_url(endpoint):
+    """Full upstream URL for an endpoint path (the Accept header lives on the session)"""
+    return f"{BASE_URL}/{endpoint}"
+
+# Shared session and fetch pool. Both are built on first use rather than at
+# import so that every gunicorn worker gets its own sockets and threads
+# instead of inheriting them across fork
+_session = None
+_pool = None
+_init_lock = threading.Lock()
+
+def get_session():
+    """Pooled session so upstream calls reuse keep-alive connections"""
+    global _session
+    if _session is None:
+        with _init_lock:
+            if _session is None:
+                session = requests.Session()
+                session.mount("https://", HTTPAdapter(
+                    pool_connections=50,
+                    pool_maxsize=50,
+                    max_retries=Retry(total=3, backoff_factor=0.2),
+                ))
+                session.headers.update({"accept": "application/json"})
+                _session = session
+    return _session
+
+def get_pool():
+    """Thread pool used to fan out independent (I/O bound) upstream fetches"""
+    global _pool
+    if _pool is None:
+        with _init_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=8)
+    return _pool
+
 CACHE_DURATION = 60
 
+# Fresh upstream payloads expire after CACHE_DURATION; the size bound keeps
+# arbitrary proxy query strings from growing the cache forever
+cache = TTLCache(maxsize=512, ttl=CACHE_DURATION)
+# Last good payload per key, served when the upstream call fails; bounded
+# like cache, evicting the least recently used key
+stale = LRUCache(maxsize=512)
+# Analysis-format rows derived from the cached "historical_data" payload, plus
+# the per-cauldron index built from them. Shared between requests, so callers
+# must treat them as read-only
+converted_cache = TTLCache(maxsize=4, ttl=CACHE_DURATION)
+# Merged drain events for the converted rows, shared the same way
+drains_cache = TTLCache(maxsize=4, ttl=CACHE_DURATION)
+# cachetools caches are not thread-safe and fetches run on pool threads
+cache_lock = threading.Lock()
+
+# The three datasets every analysis endpoint needs
+ANALYSIS_SOURCES = [
+    ("Data", "historical_data"),
+    ("Tickets", "tickets"),
+    ("Information/cauldrons", "cauldrons"),
+]
+
+def get_stale(key):
+    """Last good payload for key, or None if it was never fetched"""
+    with cache_lock:
+        data = stale.get(key)
+    if data is not None:
+        logger.warning("Returning stale cache for %s", key)
+    return data
+
 def get_cached_or_fetch(endpoint, cache_key=None, params=None):
-    """Fetch from cache or make API call - NOW WITH DETAILED LOGGING"""
+    """
+    Fetch from cache or make API call, logging details at DEBUG level.
+    cache_key may be any hashable value; it defaults to the endpoint.
+    """
     key = cache_key or endpoint
-    now = datetime.now().timestamp()
     
     # Check cache
-    if key in cache:
-        data, timestamp = cache[key]
-        if now - timestamp < CACHE_DURATION:
-            print(f"✓ Returning cached data for {key}")
-            return data
+    with cache_lock:
+        data = cache.get(key)
+    if data is not None:
+        logger.debug("Returning cached data for %s", key)
+        return data
     
     # Fetch from API
     try:
-        url = f"{BASE_URL}/{endpoint}"
-        print(f"\n{'='*60}")
-        print(f"FETCHING: {url}")
-        if params:
-            print(f"PARAMS: {params}")
+        url = upstream_url(endpoint)
+        logger.debug("FETCHING: %s PARAMS: %s", url, params)
         
-        r = requests.get(url, params=params, timeout=10)
+        # Stream the body so it is read once as bytes; r.text would decode a
+        # second full-size copy of large payloads like Data
+        r = get_session().get(url, params=params, timeout=10, stream=True)
+        body = r.content
         
-        print(f"STATUS CODE: {r.status_code}")
-        print(f"CONTENT TYPE: {r.headers.get('Content-Type', 'NOT SET')}")
-        print(f"CONTENT LENGTH: {len(r.text)} characters")
-        print(f"FIRST 500 CHARS:\n{r.text[:500]}")
-        print(f"{'='*60}\n")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "STATUS CODE: %s CONTENT TYPE: %s CONTENT LENGTH: %d bytes\nFIRST 500 BYTES:\n%r",
+                r.status_code, r.headers.get('Content-Type', 'NOT SET'), len(body), body[:500],
+            )
         
         # Check if empty
-        if not r.text or r.text.strip() == '':
-            print(f"❌ ERROR: Empty response from {url}")
-            if key in cache:
-                print(f"⚠️  Returning stale cache")
-                return cache[key][0]
-            return None
+        if not body or not body.strip():
+            logger.error("Empty response from %s", url)
+            return get_stale(key)
         
         # Check status code
         if r.status_code != 200:
-            print(f"❌ ERROR: Bad status code {r.status_code}")
-            if key in cache:
-                print(f"⚠️  Returning stale cache")
-                return cache[key][0]
-            return None
+            logger.error("Bad status code %s from %s", r.status_code, url)
+            return get_stale(key)
         
         # Try to parse JSON
         try:
-            data = r.json()
-            print(f"✓ Successfully parsed JSON")
-            print(f"  Type: {type(data)}")
-            if isinstance(data, list):
-                print(f"  Length: {len(data)} items")
-            elif isinstance(data, dict):
-                print(f"  Keys: {list(data.keys())}")
-            
-            cache[key] = (data, now)
+            data = orjson.loads(body)
+            if logger.isEnabledFor(logging.DEBUG):
+                if isinstance(data, list):
+                    logger.debug("Parsed JSON list of %d items from %s", len(data), url)
+                elif isinstance(data, dict):
+                    logger.debug("Parsed JSON object with keys %s from %s", list(data.keys()), url)
+
+            with cache_lock:
+                cache[key] = data
+                stale[key] = data
             return data
             
         except Exception as json_err:
-            print(f"❌ JSON PARSE ERROR: {json_err}")
-            print(f"  Raw content: {r.text[:200]}")
-            if key in cache:
-                print(f"⚠️  Returning stale cache")
-                return cache[key][0]
-            return None
+            logger.error("JSON parse error from %s: %s (raw content: %r)", url, json_err, body[:200])
+            return get_stale(key)
             
     except requests.exceptions.Timeout as e:
-        print(f"❌ TIMEOUT ERROR: {e}")
-        if key in cache:
-            return cache[key][0]
-        return None
+        logger.error("Timeout fetching %s: %s", endpoint, e)
+        return get_stale(key)
         
-    except Exception as e:
-        print(f"❌ UNEXPECTED ERROR: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-        if key in cache:
-            return cache[key][0]
-        return None
+    except Exception:
+        logger.exception("Unexpected error fetching %s", endpoint)
+        return get_stale(key)
+    
+def clear_caches():
+    """Drop every cached upstream payload and derived result (used by forceRefresh)"""
+    with cache_lock:
+        cache.clear()
+        converted_cache.clear()
+        drains_cache.clear()
+
+def get_converted(raw=None):
+    """
+    Historical data in analysis format, converted once per fetched payload
+    (by default the current "historical_data" one)
+    """
+    if raw is None:
+        raw = get_cached_or_fetch("Data", "historical_data")
+    return _derived(converted_cache, "historical_data", raw, convert_historical_data)
+
+def fetch_many(specs):
+    """Fetch several (endpoint, cache_key) pairs concurrently, preserving order"""
+    pool = get_pool()
+    futures = [pool.submit(get_cached_or_fetch, endpoint, key) for endpoint, key in specs]
+    return [f.result() for f in futures]
+
+def _derived(store, key, source, build):
+    """
+    build(source), cached in store under key alongside the object it came
+    from. The entry is only reused for that same source object, so anything
+    derived from an expired payload or conversion is rebuilt rather than
+    paired with fresh data
+    """
+    with cache_lock:
+        cached = store.get(key)
+    if cached is not None and cached[0] is source:
+        return cached[1]
+    value = build(source)
+    with cache_lock:
+        store[key] = (source, value)
+    return value
+
+def get_cauldron_index(converted=None):
+    """build_cauldron_index over the converted rows (by default the current ones)"""
+    if converted is None:
+        converted = get_converted()
+    return _derived(converted_cache, "index", converted, build_cauldron_index)
+
+def get_drain_events(converted=None):
+    """Merged drain events across all cauldrons for the converted rows (by default the current ones)"""
+    if converted is None:
+        converted = get_converted()
+    
+    def detect(rows):
+        cauldrons = get_cached_or_fetch("Information/cauldrons", "cauldrons")
+        drain_events = detect_drain_events(rows, cauldron_id=None, cauldron_info=cauldrons,
+                                           index=get_cauldron_index(rows))
+        return merge_nearby_drains(drain_events, max_gap_minutes=60)
     
+    return _derived(drains_cache, "all", converted, detect)
+
 def get_previous_date(date_str):
     """Get previous date in YYYY-MM-DD format"""
     from datetime import datetime, timedelta
@@ -113,29 +276,22 @@ def get_next_date(date_str):
 def debug_date_coverage():
     """Check which dates have drain data vs ticket data"""
     try:
-        historical_data = get_cached_or_fetch("Data", "historical_data")
-        tickets_response = get_cached_or_fetch("Tickets", "tickets")
-        cauldrons = get_cached_or_fetch("Information/cauldrons", "cauldrons")
+        historical_data, tickets_response, cauldrons = fetch_many(ANALYSIS_SOURCES)
         
         tickets = tickets_response.get('transport_tickets', [])
-        converted_data = convert_historical_data(historical_data)
+        converted_data = get_converted(historical_data)
         
-        drain_events = detect_drain_events(converted_data, cauldron_id=None, cauldron_info=cauldrons)
-        drain_events = merge_nearby_drains(drain_events, max_gap_minutes=60)
+        drain_events = get_drain_events(converted_data)
         
         # Get date ranges
-        drain_dates = set()
-        for drain in drain_events:
-            drain_dates.add(drain['startTime'].split('T')[0])
+        drain_dates = {drain.date for drain in drain_events}
         
         ticket_dates = set()
         for ticket in tickets:
             ticket_dates.add(ticket.get('date', '').split('T')[0])
         
         # Get data availability dates
-        data_dates = set()
-        for entry in converted_data:
-            data_dates.add(entry['timestamp'].split('T')[0])
+        data_dates = {entry['date'] for entry in converted_data}
         
         return jsonify({
             "drain_date_range": {
@@ -170,53 +326,24 @@ def debug_date_coverage():
 def debug_fill_rate_analysis():
     """Analyze why fill rate estimation is failing for some cauldrons"""
     try:
-        historical_data = get_cached_or_fetch("Data", "historical_data")
-        converted_data = convert_historical_data(historical_data)
-        
-        # Group by cauldron
-        cauldron_data = defaultdict(list)
-        for entry in converted_data:
-            cauldron_data[entry['cauldronId']].append(entry)
-        
         analysis = {}
         
-        for cid, entries in cauldron_data.items():
-            entries.sort(key=lambda x: x['timestamp'])
+        for cid, (entries, ts, lvl) in get_cauldron_index().items():
+            # Interval lengths (minutes) and level changes between samples
+            dt_min = np.diff(ts) / 60.0
+            dlvl = np.diff(lvl)
             
-            # Count increases, decreases, and flat
-            increases = 0
-            decreases = 0
-            flat = 0
-            total_intervals = 0
-            positive_rates = []
+            # Count increases, decreases, and flat over valid intervals
+            valid = (dt_min > 0) & (dt_min <= 5)
+            inc = valid & (dlvl > 0)
+            dec = valid & (dlvl < 0)
+            increases = int(np.count_nonzero(inc))
+            decreases = int(np.count_nonzero(dec))
+            total_intervals = int(np.count_nonzero(valid))
+            flat = total_intervals - increases - decreases
             
-            for i in range(len(entries) - 1):
-                try:
-                    curr = entries[i]
-                    next_e = entries[i + 1]
-                    
-                    time_curr = datetime.fromisoformat(curr['timestamp'].replace('Z', '+00:00'))
-                    time_next = datetime.fromisoformat(next_e['timestamp'].replace('Z', '+00:00'))
-                    time_diff_min = (time_next - time_curr).total_seconds() / 60
-                    
-                    if time_diff_min <= 0 or time_diff_min > 5:
-                        continue
-                    
-                    level_change = next_e['level'] - curr['level']
-                    total_intervals += 1
-                    
-                    if level_change > 0:
-                        increases += 1
-                        rate = level_change / time_diff_min
-                        if 0.01 < rate < 10:
-                            positive_rates.append(rate)
-                    elif level_change < 0:
-                        decreases += 1
-                    else:
-                        flat += 1
-                        
-                except:
-                    continue
+            positive_rates = dlvl[inc] / dt_min[inc]
+            positive_rates = positive_rates[(positive_rates > 0.01) & (positive_rates < 10)]
             
             fill_rate = estimate_fill_rate(entries)
             
@@ -226,10 +353,10 @@ def debug_fill_rate_analysis():
                 "increases": increases,
                 "decreases": decreases,
                 "flat": flat,
-                "positive_rates_found": len(positive_rates),
+                "positive_rates_found": int(positive_rates.size),
                 "estimated_fill_rate": round(fill_rate, 3) if fill_rate > 0 else 0,
-                "median_positive_rate": round(statistics.median(positive_rates), 3) if positive_rates else 0,
-                "sample_positive_rates": [round(r, 3) for r in positive_rates[:10]],
+                "median_positive_rate": round(float(np.median(positive_rates)), 3) if positive_rates.size else 0,
+                "sample_positive_rates": [round(float(r), 3) for r in positive_rates[:10]],
                 "will_be_processed": fill_rate > 0
             }
         
@@ -253,17 +380,8 @@ def debug_fill_rate_analysis():
 @app.route("/api/debug/estimated-rates")
 def debug_estimated_rates():
     """See what fill rates we're estimating"""
-    historical_data = get_cached_or_fetch("Data", "historical_data")
-    converted_data = convert_historical_data(historical_data)
-    
-    # Group by cauldron
-    cauldron_data = defaultdict(list)
-    for entry in converted_data:
-        cauldron_data[entry['cauldronId']].append(entry)
-    
     rates = {}
-    for cid, entries in list(cauldron_data.items())[:5]:  # First 5
-        entries.sort(key=lambda x: x['timestamp'])
+    for cid, (entries, _, _) in islice(get_cauldron_index().items(), 5):  # First 5
         fill_rate = estimate_fill_rate(entries)
         rates[cid] = {
             "fill_rate": round(fill_rate, 3),
@@ -281,7 +399,7 @@ def debug_historical_data():
         if not historical_data:
             return jsonify({"error": "No historical data"})
         
-        converted_data = convert_historical_data(historical_data)
+        converted_data = get_converted(historical_data)
         
         debug_info = {
             "raw_data_type": str(type(historical_data)),
@@ -294,16 +412,9 @@ def debug_historical_data():
         
         # Check for level changes
         if converted_data:
-            cauldron_data = {}
-            for entry in converted_data[:1000]:  # First 1000 entries
-                cid = entry['cauldronId']
-                if cid not in cauldron_data:
-                    cauldron_data[cid] = []
-                cauldron_data[cid].append(entry)
-            
-            # Analyze one cauldron
-            sample_cauldron = list(cauldron_data.keys())[0]
-            entries = sorted(cauldron_data[sample_cauldron], key=lambda x: x['timestamp'])[:20]
+            # Analyze one cauldron (the first one in the feed)
+            sample_cauldron = converted_data[0]['cauldronId']
+            entries = get_cauldron_index(converted_data)[sample_cauldron].entries[:20]
             
             level_changes = []
             for i in range(1, len(entries)):
@@ -337,24 +448,15 @@ def home():
 def discrepancy_detection():
     """Perform full discrepancy detection between tickets and drain data."""
     try:
-        historical_data = get_cached_or_fetch("Data", "historical_data")
-        tickets_response = get_cached_or_fetch("Tickets", "tickets")
-        cauldrons = get_cached_or_fetch("Information/cauldrons", "cauldrons")  # ADD THIS
+        historical_data, tickets_response, cauldrons = fetch_many(ANALYSIS_SOURCES)
         tickets = tickets_response.get("transport_tickets", [])
-        data = convert_historical_data(historical_data)
-        drain_events = detect_drain_events(data, cauldron_id=None, cauldron_info=cauldrons)
-        drain_events = merge_nearby_drains(drain_events, max_gap_minutes=60)  # Add this line
+        drain_events = get_drain_events()
         discrepancies = find_discrepancies(drain_events, tickets)
 
         return jsonify({
             "success": True,
             "discrepancies": discrepancies,
-            "summary": {
-                "total": len(discrepancies),
-                "discrepancy": len([d for d in discrepancies if d["severity"] == "discrepancy"]),
-                "high": len([d for d in discrepancies if d["severity"] == "high"]),
-                "medium": len([d for d in discrepancies if d["severity"] == "medium"]),
-            }
+            "summary": summarize_severities(discrepancies)
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -372,7 +474,7 @@ def analyze_drain_events():
     try:
         force_refresh = request.args.get("forceRefresh", "false").lower() == "true"
         if force_refresh:
-            cache.clear()
+            clear_caches()
         if request.method == 'POST' and request.is_json:
             params = request.get_json()
         else:
@@ -380,13 +482,10 @@ def analyze_drain_events():
         cauldron_id = params.get('cauldronId')
         
         # Fetch historical data AND cauldron info
-        historical_data = get_cached_or_fetch("Data", "historical_data")
-        cauldrons = get_cached_or_fetch("Information/cauldrons", "cauldrons")
-        converted_data = convert_historical_data(historical_data)
+        historical_data, cauldrons = fetch_many([("Data", "historical_data"), ("Information/cauldrons", "cauldrons")])
         
         # Pass cauldron info to drain detection
-        drain_events = detect_drain_events(converted_data, cauldron_id=None, cauldron_info=cauldrons)
-        drain_events = merge_nearby_drains(drain_events, max_gap_minutes=60) 
+        drain_events = get_drain_events()
         return jsonify({
             "success": True,
             "drainEvents": drain_events,
@@ -404,7 +503,7 @@ def analyze_discrepancies():
     try:
         force_refresh = request.args.get("forceRefresh", "false").lower() == "true"
         if force_refresh:
-            cache.clear()
+            clear_caches()
         
         # Handle parameters for both GET and POST
         threshold = 0.05  # default
@@ -417,9 +516,7 @@ def analyze_discrepancies():
             threshold = float(request.args.get('threshold', 0.05))
         
         # Fetch required data including cauldron info
-        historical_data = get_cached_or_fetch("Data", "historical_data")
-        tickets_response = get_cached_or_fetch("Tickets", "tickets")
-        cauldrons = get_cached_or_fetch("Information/cauldrons", "cauldrons")
+        historical_data, tickets_response, cauldrons = fetch_many(ANALYSIS_SOURCES)
         
         if not historical_data or not tickets_response:
             return jsonify({
@@ -429,25 +526,18 @@ def analyze_discrepancies():
                 "summary": {"total": 0, "discrepancy": 0, "high": 0, "medium": 0}
             })
         
-        converted_data = convert_historical_data(historical_data)
         tickets = tickets_response.get('transport_tickets', [])
         
         # Detect drain events with cauldron info
         
-        drain_events = detect_drain_events(converted_data, cauldron_id=None, cauldron_info=cauldrons)
-        drain_events = merge_nearby_drains(drain_events, max_gap_minutes=60) 
+        drain_events = get_drain_events()
         # Find discrepancies
         discrepancies = find_discrepancies(drain_events, tickets, threshold)
         
         return jsonify({
             "success": True,
             "discrepancies": discrepancies,
-            "summary": {
-                "total": len(discrepancies),
-                "discrepancy": len([d for d in discrepancies if d['severity'] == 'discrepancy']),
-                "high": len([d for d in discrepancies if d['severity'] == 'high']),
-                "medium": len([d for d in discrepancies if d['severity'] == 'medium'])
-            }
+            "summary": summarize_severities(discrepancies)
         })
     except Exception as e:
         import traceback
@@ -465,40 +555,26 @@ def analyze_summary():
     try:
         force_refresh = request.args.get("forceRefresh", "false").lower() == "true"
         if force_refresh:
-            cache.clear()
+            clear_caches()
         # Fetch all required data
-        historical_data = get_cached_or_fetch("Data", "historical_data")
-        tickets_response = get_cached_or_fetch("Tickets", "tickets")
-        cauldrons = get_cached_or_fetch("Information/cauldrons", "cauldrons")
+        historical_data, tickets_response, cauldrons = fetch_many(ANALYSIS_SOURCES)
         
         # Convert historical data format
-        converted_data = convert_historical_data(historical_data)
+        converted_data = get_converted(historical_data)
         tickets = tickets_response.get('transport_tickets', [])
         
         # Run analyses with cauldron info
         
-        drain_events = detect_drain_events(converted_data, cauldron_id=None, cauldron_info=cauldrons)
-        drain_events = merge_nearby_drains(drain_events, max_gap_minutes=60) 
+        drain_events = get_drain_events(converted_data)
         discrepancies = find_discrepancies(drain_events, tickets)
-        fill_rates = calculate_fill_rates(converted_data)
-        predictions = predict_overflow(converted_data, cauldrons, fill_rates, 24)
+        index = get_cauldron_index(converted_data)
+        fill_rates = calculate_fill_rates(converted_data, index=index)
+        predictions = predict_overflow(converted_data, cauldrons, fill_rates, 24, index=index)
         
         return jsonify({
             "success": True,
             "timestamp": datetime.now().isoformat(),
-            "summary": {
-                "totalCauldrons": len(cauldrons),
-                "totalDrainEvents": len(drain_events),
-                "totalTickets": tickets_response.get('metadata', {}).get('total_tickets', len(tickets)),
-                "suspiciousTickets": tickets_response.get('metadata', {}).get('suspicious_tickets', 0),
-                "discrepancies": {
-                    "total": len(discrepancies),
-                    "discrepancy": len([d for d in discrepancies if d['severity'] == 'discrepancy']),
-                    "high": len([d for d in discrepancies if d['severity'] == 'high']),
-                    "medium": len([d for d in discrepancies if d['severity'] == 'medium'])
-                },
-                "overflowRisk": len([p for p in predictions if p['urgency'] == 'discrepancy'])
-            }
+            "summary": build_summary(cauldrons, tickets_response, drain_events, discrepancies, predictions)
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -507,51 +583,78 @@ def analyze_summary():
 def get_annotated_tickets():
     """Get tickets with discrepancy annotations"""
     try:
-        tickets_response = get_cached_or_fetch("Tickets", "tickets")
-        historical_data = get_cached_or_fetch("Data", "historical_data")
-        cauldrons = get_cached_or_fetch("Information/cauldrons", "cauldrons")
+        historical_data, tickets_response, cauldrons = fetch_many(ANALYSIS_SOURCES)
         
         tickets = tickets_response.get('transport_tickets', [])
-        converted_data = convert_historical_data(historical_data)
         
-        drain_events = detect_drain_events(converted_data, cauldron_id=None, cauldron_info=cauldrons)
-        drain_events = merge_nearby_drains(drain_events, max_gap_minutes=60) 
+        drain_events = get_drain_events()
         discrepancies = find_discrepancies(drain_events, tickets)
         
         # Use the annotate function
         annotated = annotate_tickets_with_discrepancies(tickets, discrepancies)
+        # Clean tickets carry a None severity, so everything else is suspicious
+        severity_counts = Counter(t['suspicion_severity'] for t in annotated)
         
         return jsonify({
             "success": True,
             "tickets": annotated,
             "summary": {
                 "total": len(tickets),
-                "suspicious": len([t for t in annotated if t.get('is_suspicious')]),
-                "discrepancy": len([t for t in annotated if t.get('suspicion_severity') == 'discrepancy'])
+                "suspicious": len(annotated) - severity_counts[None],
+                "discrepancy": severity_counts['discrepancy']
             }
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/analyze/all", methods=['GET'])
+def analyze_all():
+    """
+    Summary, discrepancies, drain events and annotated tickets in one response.
+    Runs the shared pipeline once instead of once per dashboard request.
+    """
+    try:
+        force_refresh = request.args.get("forceRefresh", "false").lower() == "true"
+        if force_refresh:
+            clear_caches()
+        historical_data, tickets_response, cauldrons = fetch_many(ANALYSIS_SOURCES)
+        
+        converted_data = get_converted(historical_data)
+        tickets = tickets_response.get('transport_tickets', [])
+        
+        drain_events = get_drain_events(converted_data)
+        discrepancies = find_discrepancies(drain_events, tickets)
+        index = get_cauldron_index(converted_data)
+        fill_rates = calculate_fill_rates(converted_data, index=index)
+        predictions = predict_overflow(converted_data, cauldrons, fill_rates, 24, index=index)
+        annotated = annotate_tickets_with_discrepancies(tickets, discrepancies)
+        
+        return jsonify({
+            "success": True,
+            "timestamp": datetime.now().isoformat(),
+            "summary": build_summary(cauldrons, tickets_response, drain_events, discrepancies, predictions),
+            "discrepancies": discrepancies,
+            "drainEvents": drain_events,
+            "annotatedTickets": annotated
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/api/debug/drain-detection-all-cauldrons", methods=['GET'])
 def debug_drain_detection_all_cauldrons():
     """Debug drain detection across ALL cauldrons"""
     try:
-        historical_data = get_cached_or_fetch("Data", "historical_data")
-        cauldrons = get_cached_or_fetch("Information/cauldrons", "cauldrons")
-        converted_data = convert_historical_data(historical_data)
+        historical_data, tickets_response, cauldrons = fetch_many(ANALYSIS_SOURCES)
         
         # Detect drains for ALL cauldrons
-        
-        drain_events = detect_drain_events(converted_data, cauldron_id=None, cauldron_info=cauldrons)
-        drain_events = merge_nearby_drains(drain_events, max_gap_minutes=60) 
+        drain_events = get_drain_events()
         # Group by cauldron
-        drains_by_cauldron = defaultdict(list)
-        for drain in drain_events:
-            drains_by_cauldron[drain['cauldronId']].append(drain)
+        drains_sorted = sorted(drain_events, key=attrgetter('cauldronId'))
+        drains_per_cauldron = {
+            cid: sum(1 for _ in group)
+            for cid, group in groupby(drains_sorted, key=attrgetter('cauldronId'))
+        }
         
-        # Get tickets
-        tickets_response = get_cached_or_fetch("Tickets", "tickets")
         tickets = tickets_response.get('transport_tickets', []) if tickets_response else []
         
         tickets_by_cauldron = defaultdict(int)
@@ -561,7 +664,7 @@ def debug_drain_detection_all_cauldrons():
         summary = {
             "total_drains_detected": len(drain_events),
             "total_tickets": len(tickets),
-            "drains_per_cauldron": {cid: len(drains) for cid, drains in drains_by_cauldron.items()},
+            "drains_per_cauldron": drains_per_cauldron,
             "tickets_per_cauldron": dict(tickets_by_cauldron),
             "sample_drains": drain_events[:20]  # First 20 drains
         }
@@ -582,7 +685,7 @@ def test_simple():
     
     # Test 1: Can we reach the API at all?
     try:
-        r = requests.get(f"{BASE_URL}/Data", timeout=5)
+        r = get_session().get(upstream_url("Data"), timeout=5)
         results['data_endpoint'] = {
             'status': r.status_code,
             'success': r.status_code == 200,
@@ -594,7 +697,7 @@ def test_simple():
     
     # Test 2: Can we get tickets?
     try:
-        r = requests.get(f"{BASE_URL}/Tickets", timeout=5)
+        r = get_session().get(upstream_url("Tickets"), timeout=5)
         results['tickets_endpoint'] = {
             'status': r.status_code,
             'success': r.status_code == 200,
@@ -610,18 +713,14 @@ def test_simple():
 def debug_matching():
     """Debug ticket-to-drain matching to see what's going wrong"""
     try:
-        historical_data = get_cached_or_fetch("Data", "historical_data")
-        tickets_response = get_cached_or_fetch("Tickets", "tickets")
-        cauldrons = get_cached_or_fetch("Information/cauldrons", "cauldrons")
+        historical_data, tickets_response, cauldrons = fetch_many(ANALYSIS_SOURCES)
         
         if not historical_data or not tickets_response:
             return jsonify({"error": "Failed to fetch data"})
         
         tickets = tickets_response.get('transport_tickets', [])
-        converted_data = convert_historical_data(historical_data)
         
-        drain_events = detect_drain_events(converted_data, cauldron_id=None, cauldron_info=cauldrons)
-        drain_events = merge_nearby_drains(drain_events, max_gap_minutes=60) 
+        drain_events = get_drain_events()
         # Get a sample day to debug
         sample_ticket = tickets[0] if tickets else None
         
@@ -649,15 +748,13 @@ def debug_matching():
         
         # Group drains by date
         for d in drain_events[:10]:
-            date = d['startTime'].split('T')[0]
-            cauldron = d['cauldronId']
-            key = f"{date}_{cauldron}"
+            key = f"{d.date}_{d.cauldronId}"
             if key not in debug_info["drains_by_date"]:
                 debug_info["drains_by_date"][key] = []
             debug_info["drains_by_date"][key].append({
-                "volume": d['totalPotionRemoved'],
-                "startTime": d['startTime'],
-                "duration": d['duration']
+                "volume": d.totalPotionRemoved,
+                "startTime": d.startTime,
+                "duration": d.duration
             })
         
         return jsonify(debug_info)
@@ -679,7 +776,7 @@ def list_routes():
             "methods": list(rule.methods),
             "path": str(rule.rule)
         })
-    return jsonify(sorted(routes, key=lambda x: x['path']))
+    return jsonify(sorted(routes, key=itemgetter('path')))
 
 @app.route("/api/<path:endpoint>")
 def proxy(endpoint):
@@ -696,7 +793,8 @@ def proxy(endpoint):
             }), 404
         
         params = request.args.to_dict()
-        cache_key = f"{endpoint}_{str(params)}" if params else endpoint
+        # Canonical hashable key, so the same query in any order shares an entry
+        cache_key = (endpoint, tuple(sorted(params.items()))) if params else endpoint
         data = get_cached_or_fetch(endpoint, cache_key, params if params else None)
         
         if data is None:
@@ -710,32 +808,265 @@ def proxy(endpoint):
 # Helper Functions
 # =======================
 
+try:
+    # C parser; accepts a trailing 'Z' without rewriting the string
+    from ciso8601 import parse_datetime as parse_iso
+except ImportError:
+    # So does fromisoformat on Python 3.11+, which the pinned numpy requires
+    parse_iso = datetime.fromisoformat
+
+def iso_to_epoch(timestamp):
+    """Seconds since the epoch for an ISO-8601 timestamp (naive means UTC)"""
+    dt = parse_iso(timestamp)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def _to_arrays(entries):
+    """
+    Epoch-second and level arrays for one cauldron's time-ordered rows, so the
+    analysis loops index floats instead of re-parsing timestamps
+    """
+    n = len(entries)
+    ts = np.fromiter((e['epoch'] for e in entries), dtype=np.float64, count=n)
+    lvl = np.fromiter((e['level'] for e in entries), dtype=np.float64, count=n)
+    return ts, lvl
+
+CauldronSeries = namedtuple('CauldronSeries', ['entries', 'ts', 'lvl'])
+
+def build_cauldron_index(data):
+    """
+    Group converted rows by cauldron (first-seen order) and put each group in
+    time order, alongside its epoch/level arrays from _to_arrays. Built once
+    and shared by drain detection, fill rates and overflow prediction.
+    """
+    cauldron_data = defaultdict(list)
+    for entry in data:
+        cauldron_data[entry['cauldronId']].append(entry)
+    
+    index = {}
+    for cid, entries in cauldron_data.items():
+        ts, lvl = _to_arrays(entries)
+        # The upstream feed is normally chronological already
+        if (ts[1:] < ts[:-1]).any():
+            order = np.argsort(ts, kind='stable')
+            entries, ts, lvl = [entries[i] for i in order.tolist()], ts[order], lvl[order]
+        index[cid] = CauldronSeries(entries, ts, lvl)
+    return index
+
+def iso_to_epochs(timestamps):
+    """
+    iso_to_epoch over a list of timestamps. Naive and 'Z' strings (what the
+    upstream sends) go through one vectorized numpy parse; if any carries an
+    explicit UTC offset, or numpy rejects one, each is parsed on its own and
+    any that cannot be parsed comes back as None.
+    """
+    naive = [ts[:-1] if ts.endswith('Z') else ts for ts in timestamps]
+    if not any('+' in ts[10:] or '-' in ts[10:] for ts in naive):
+        try:
+            parsed = np.array(naive, dtype='datetime64[us]')
+        except ValueError:
+            pass
+        else:
+            if not np.isnat(parsed).any():
+                return (parsed.astype(np.int64) / 1e6).tolist()
+    epochs = []
+    for ts in timestamps:
+        try:
+            epochs.append(iso_to_epoch(ts))
+        except ValueError:
+            logger.warning("Skipping reading with unparseable timestamp %r", ts)
+            epochs.append(None)
+    return epochs
+
 def convert_historical_data(raw_data):
     """
     Convert API format to analysis format
     From: [{ timestamp, cauldron_levels: { cauldron_001: 123 } }]
-    To: [{ timestamp, cauldronId: "cauldron_001", level: 123 }]
+    To: [{ timestamp, cauldronId: "cauldron_001", level: 123, epoch: 1730246400.0, date: "2024-10-30" }]
+    Each timestamp is parsed once here (epoch seconds) so analysis loops can
+    subtract floats instead of re-parsing ISO strings, and its date is split
+    off once per reading rather than once per row. Rows without a timestamp,
+    or with one that cannot be parsed, cannot be placed in time and are skipped.
     """
-    converted = []
-    for entry in raw_data:
-        timestamp = entry.get('timestamp')
-        cauldron_levels = entry.get('cauldron_levels', {})
-        
-        for cauldron_id, level in cauldron_levels.items():
-            converted.append({
-                'timestamp': timestamp,
-                'cauldronId': cauldron_id,
-                'level': level
-            })
-    
-    return converted
+    readings = [entry for entry in raw_data if entry.get('timestamp')]
+    epochs = iso_to_epochs([entry['timestamp'] for entry in readings])
+    return [
+        {'timestamp': timestamp, 'cauldronId': cauldron_id, 'level': level, 'epoch': epoch, 'date': date}
+        for entry, epoch in zip(readings, epochs)
+        if epoch is not None
+        for timestamp in (entry['timestamp'],)
+        for date in (timestamp.split('T')[0],)
+        for cauldron_id, level in entry.get('cauldron_levels', {}).items()
+    ]
 
 # =======================
 # Analysis Functions
 # =======================
 
+def summarize_severities(discrepancies):
+    """Discrepancy totals by severity, counted in one pass"""
+    severity_counts = Counter(d['severity'] for d in discrepancies)
+    return {
+        "total": len(discrepancies),
+        "discrepancy": severity_counts['discrepancy'],
+        "high": severity_counts['high'],
+        "medium": severity_counts['medium'],
+    }
+
+def build_summary(cauldrons, tickets_response, drain_events, discrepancies, predictions):
+    """System status block shared by /api/analyze/summary and /api/analyze/all"""
+    tickets = tickets_response.get('transport_tickets', [])
+    metadata = tickets_response.get('metadata', {})
+    urgency_counts = Counter(p['urgency'] for p in predictions)
+    return {
+        "totalCauldrons": len(cauldrons),
+        "totalDrainEvents": len(drain_events),
+        "totalTickets": metadata.get('total_tickets', len(tickets)),
+        "suspiciousTickets": metadata.get('suspicious_tickets', 0),
+        "discrepancies": summarize_severities(discrepancies),
+        "overflowRisk": urgency_counts['discrepancy']
+    }
+
+
+
+# Drain events are kept as compact tuples (tens of thousands can be cached at
+# once); the JSON provider turns them back into objects on the way out
+DrainEvent = namedtuple('DrainEvent', [
+    'cauldronId', 'startTime', 'endTime', 'duration', 'levelDrop',
+    'potionGeneratedDuringDrain', 'totalPotionRemoved', 'estimatedFillRate',
+    'estimatedDrainRate', 'startLevel', 'endLevel', 'date',
+])
+
+# STRICTER THRESHOLD: Only detect when rate is < 30% of fill rate
+# This catches real drains but ignores minor fluctuations
+DRAIN_THRESHOLD = 0.3  # Was 0.5, now 0.3
+
+# STRICTER THRESHOLDS:
+# - Minimum 20 minutes (was 10)
+# - Minimum 30L removed (was 10L)
+# This filters out noise and small fluctuations
+MIN_DURATION = 20  # minutes
+MIN_VOLUME = 30    # liters
+
+
+try:
+    from numba import njit, prange
+except ImportError:
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit: kernels run as plain Python without numba"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+    prange = range
+
+# Explicit signatures make numba compile the kernels (or load them from its
+# on-disk cache) at import, so the first analyze request doesn't pay for JIT
+_SCAN_DRAINS_SIG = "Tuple((int64[::1], int64[::1]))(float64[::1], float64[::1], int64[::1], boolean[::1], int64[::1], float64, int64, int64)"
+_SCAN_ALL_SIG = "Tuple((int64[::1], int64[::1], int64[::1]))(float64[::1], float64[::1], int64[::1], boolean[::1], int64[::1], int64[::1], float64[::1], int64, int64)"
+
+# numba's workqueue threading layer (used when neither TBB nor OpenMP is
+# installed) cannot run two parallel kernels at once, so requests take turns
+_scan_lock = threading.Lock()
+
+
+def _window_ends(ts):
+    """
+    A window opened at row i closes at the first row at least 20 samples
+    and 25 minutes later (one searchsorted over the sorted times), provided
+    that row is within 50 samples and 35 minutes; -1 means no window
+    """
+    n = ts.shape[0]
+    idx = np.arange(n)
+    target = np.maximum(np.searchsorted(ts, ts + 25 * 60), idx + 20)
+    in_range = target < np.minimum(idx + 50, n)
+    in_range[in_range] = (ts[target[in_range]] - ts[in_range]) / 60 <= 35
+    return np.where(in_range, target, -1)
+
+
+def _draining_windows(ts, lvl, fill_rate):
+    """
+    Vectorized window pass over one cauldron's sorted readings. Returns
+    window_end (see _window_ends), whether each row's window drains (net
+    rate below DRAIN_THRESHOLD of the fill rate), and the first draining row
+    at or after each row (n if none) so the scan can jump between candidates.
+    """
+    n = ts.shape[0]
+    window_end = _window_ends(ts)
+    rows = np.flatnonzero(window_end >= 0)
+    ends = window_end[rows]
+    
+    draining = np.zeros(n, dtype=np.bool_)
+    draining[rows] = (lvl[ends] - lvl[rows]) / ((ts[ends] - ts[rows]) / 60) < fill_rate * DRAIN_THRESHOLD
+    next_draining = np.minimum.accumulate(np.where(draining, np.arange(n), n)[::-1])[::-1]
+    return window_end, draining, next_draining
+
+
+@njit(_SCAN_DRAINS_SIG, cache=True)
+def _scan_drains(ts, lvl, window_end, draining, next_draining, fill_rate, min_duration, min_volume):
+    """
+    Start/end row indices of the drains in one cauldron's sorted readings,
+    given the window arrays from _draining_windows. Draining windows are
+    chained end to start, and the run is kept if it lasts min_duration
+    minutes and removes min_volume liters.
+    """
+    n = ts.shape[0]
+    starts = np.empty(n, dtype=np.int64)
+    ends = np.empty(n, dtype=np.int64)
+    count = 0
+    
+    i = 0
+    while i < n - 30:
+        # Skip ahead to the next window that drains
+        i = next_draining[i]
+        if i >= n - 30:
+            break
+        
+        # Extend drain period
+        end = window_end[i]
+        while end < n - 30 and draining[end]:
+            end = window_end[end]
+        
+        duration = (ts[end] - ts[i]) / 60
+        removed = (lvl[i] - lvl[end]) + fill_rate * duration
+        if duration >= min_duration and removed >= min_volume:
+            starts[count] = i
+            ends[count] = end
+            count += 1
+            i = end + 1
+        else:
+            i += 1
+    
+    return starts[:count], ends[:count]
+
+
+@njit(_SCAN_ALL_SIG, parallel=True, cache=True)
+def _scan_all(ts, lvl, window_end, draining, next_draining, offsets, fill_rates, min_duration, min_volume):
+    """
+    _scan_drains for every cauldron at once, one cauldron per thread.
+    Cauldron c owns rows offsets[c]:offsets[c + 1] of the concatenated arrays
+    and its drains are written from offsets[c] onward (indices relative to
+    the cauldron); counts[c] says how many there are.
+    """
+    n_cauldrons = offsets.shape[0] - 1
+    starts = np.empty(ts.shape[0], dtype=np.int64)
+    ends = np.empty(ts.shape[0], dtype=np.int64)
+    counts = np.zeros(n_cauldrons, dtype=np.int64)
+    
+    for c in prange(n_cauldrons):
+        lo = offsets[c]
+        hi = offsets[c + 1]
+        s, e = _scan_drains(ts[lo:hi], lvl[lo:hi], window_end[lo:hi], draining[lo:hi],
+                            next_draining[lo:hi], fill_rates[c], min_duration, min_volume)
+        count = s.shape[0]
+        starts[lo:lo + count] = s
+        ends[lo:lo + count] = e
+        counts[c] = count
+    
+    return starts, ends, counts
+
 
-def detect_drain_events(data, cauldron_id=None, cauldron_info=None):
+def detect_drain_events(data, cauldron_id=None, cauldron_info=None, index=None):
     """
     Improved drain detection with stricter criteria to reduce false positives.
     Key changes:
@@ -745,140 +1076,93 @@ def detect_drain_events(data, cauldron_id=None, cauldron_info=None):
     4. Better handling of brief fluctuations
     """
     drain_events = []
+    if index is None:
+        index = build_cauldron_index(data)
     
-    # Group data by cauldron
-    cauldron_data = defaultdict(list)
-    for entry in data:
-        cid = entry.get('cauldronId')
-        if cauldron_id is None or cid == cauldron_id:
-            cauldron_data[cid].append(entry)
-    
-    # Process each cauldron
-    for cid, entries in cauldron_data.items():
-        entries.sort(key=lambda x: x.get('timestamp', ''))
+    # Collect the cauldrons to scan
+    scanned = []
+    for cid, series in index.items():
+        if cauldron_id is not None and cid != cauldron_id:
+            continue
         
-        if len(entries) < 10:
+        if len(series.entries) < 10:
             continue
         
         # Estimate fill rate
-        fill_rate = estimate_fill_rate(entries)
+        fill_rate = estimate_fill_rate(series.entries)
         if fill_rate <= 0:
             fill_rate = 0.1
         
-        # STRICTER THRESHOLD: Only detect when rate is < 30% of fill rate
-        # This catches real drains but ignores minor fluctuations
-        DRAIN_THRESHOLD = 0.3  # Was 0.5, now 0.3
-        
-        i = 0
-        while i < len(entries) - 30:
-            start_idx = i
-            start_entry = entries[start_idx]
+        scanned.append((cid, series, fill_rate))
+    
+    if not scanned:
+        return drain_events
+    
+    windows = [_draining_windows(series.ts, series.lvl, fill_rate) for _, series, fill_rate in scanned]
+    
+    # Scan them all in one parallel kernel over the concatenated arrays
+    offsets = np.cumsum([0] + [len(series.entries) for _, series, _ in scanned], dtype=np.int64)
+    with _scan_lock:
+        starts, ends, counts = _scan_all(
+            np.concatenate([series.ts for _, series, _ in scanned]),
+            np.concatenate([series.lvl for _, series, _ in scanned]),
+            *(np.concatenate(column) for column in zip(*windows)),
+            offsets,
+            np.array([fill_rate for _, _, fill_rate in scanned], dtype=np.float64),
+            MIN_DURATION, MIN_VOLUME,
+        )
+    
+    # Calculate final statistics
+    for (cid, (entries, ts, _), fill_rate), lo, count in zip(scanned, offsets.tolist(), counts.tolist()):
+        estimated_fill_rate = round(fill_rate, 3)
+        for drain_start_idx, drain_end_idx in zip(starts[lo:lo + count].tolist(), ends[lo:lo + count].tolist()):
+            final_start = entries[drain_start_idx]
+            final_end = entries[drain_end_idx]
             
-            try:
-                start_time = datetime.fromisoformat(start_entry['timestamp'].replace('Z', '+00:00'))
-                
-                # Find entry ~30 minutes later
-                target_idx = None
-                for j in range(i + 20, min(i + 50, len(entries))):
-                    check_time = datetime.fromisoformat(entries[j]['timestamp'].replace('Z', '+00:00'))
-                    time_diff = (check_time - start_time).total_seconds() / 60
-                    if 25 <= time_diff <= 35:
-                        target_idx = j
-                        break
-                
-                if target_idx is None:
-                    i += 1
-                    continue
-                
-                end_entry = entries[target_idx]
-                end_time = datetime.fromisoformat(end_entry['timestamp'].replace('Z', '+00:00'))
-                window_duration = (end_time - start_time).total_seconds() / 60
-                
-                expected_increase = fill_rate * window_duration
-                actual_change = end_entry['level'] - start_entry['level']
-                net_rate = actual_change / window_duration
-                
-                # STRICTER: Only trigger on significant deviations
-                if net_rate < fill_rate * DRAIN_THRESHOLD:
-                    drain_start_idx = i
-                    drain_end_idx = target_idx
-                    
-                    # Extend drain period
-                    k = target_idx
-                    while k < len(entries) - 30:
-                        check_start = entries[k]
-                        check_start_time = datetime.fromisoformat(check_start['timestamp'].replace('Z', '+00:00'))
-                        
-                        next_idx = None
-                        for m in range(k + 20, min(k + 50, len(entries))):
-                            check_time = datetime.fromisoformat(entries[m]['timestamp'].replace('Z', '+00:00'))
-                            time_diff = (check_time - check_start_time).total_seconds() / 60
-                            if 25 <= time_diff <= 35:
-                                next_idx = m
-                                break
-                        
-                        if next_idx is None:
-                            break
-                        
-                        check_end = entries[next_idx]
-                        check_end_time = datetime.fromisoformat(check_end['timestamp'].replace('Z', '+00:00'))
-                        check_duration = (check_end_time - check_start_time).total_seconds() / 60
-                        check_change = check_end['level'] - check_start['level']
-                        check_rate = check_change / check_duration
-                        
-                        if check_rate < fill_rate * DRAIN_THRESHOLD:
-                            drain_end_idx = next_idx
-                            k = next_idx
-                        else:
-                            break
-                    
-                    # Calculate final statistics
-                    final_start = entries[drain_start_idx]
-                    final_end = entries[drain_end_idx]
-                    
-                    final_start_time = datetime.fromisoformat(final_start['timestamp'].replace('Z', '+00:00'))
-                    final_end_time = datetime.fromisoformat(final_end['timestamp'].replace('Z', '+00:00'))
-                    total_duration = (final_end_time - final_start_time).total_seconds() / 60
-                    
-                    level_drop = final_start['level'] - final_end['level']
-                    potion_generated = fill_rate * total_duration
-                    total_removed = level_drop + potion_generated
-                    
-                    # STRICTER THRESHOLDS:
-                    # - Minimum 20 minutes (was 10)
-                    # - Minimum 30L removed (was 10L)
-                    # This filters out noise and small fluctuations
-                    MIN_DURATION = 20  # minutes
-                    MIN_VOLUME = 30    # liters
-                    
-                    if total_duration >= MIN_DURATION and total_removed >= MIN_VOLUME:
-                        drain_events.append({
-                            "cauldronId": cid,
-                            "startTime": final_start['timestamp'],
-                            "endTime": final_end['timestamp'],
-                            "duration": round(total_duration, 2),
-                            "levelDrop": round(level_drop, 2),
-                            "potionGeneratedDuringDrain": round(potion_generated, 2),
-                            "totalPotionRemoved": round(total_removed, 2),
-                            "estimatedFillRate": round(fill_rate, 3),
-                            "estimatedDrainRate": round(total_removed / total_duration, 3) if total_duration > 0 else 0,
-                            "startLevel": round(final_start['level'], 2),
-                            "endLevel": round(final_end['level'], 2)
-                        })
-                        
-                        i = drain_end_idx + 1
-                    else:
-                        i += 1
-                else:
-                    i += 1
-                    
-            except Exception as e:
-                i += 1
-                continue
+            total_duration = float(ts[drain_end_idx] - ts[drain_start_idx]) / 60
+            
+            level_drop = final_start['level'] - final_end['level']
+            potion_generated = fill_rate * total_duration
+            total_removed = level_drop + potion_generated
+            
+            drain_events.append(DrainEvent(
+                cauldronId=cid,
+                startTime=final_start['timestamp'],
+                endTime=final_end['timestamp'],
+                duration=round(total_duration, 2),
+                levelDrop=round(level_drop, 2),
+                potionGeneratedDuringDrain=round(potion_generated, 2),
+                totalPotionRemoved=round(total_removed, 2),
+                estimatedFillRate=estimated_fill_rate,
+                estimatedDrainRate=round(total_removed / total_duration, 3) if total_duration > 0 else 0,
+                startLevel=round(final_start['level'], 2),
+                endLevel=round(final_end['level'], 2),
+                date=final_start['date']
+            ))
     
     return drain_events
 
 
+def _merge_run(run, start_epoch, end_epoch):
+    """One drain event spanning a run of nearby drains (the drain itself if alone)"""
+    first, last = run[0], run[-1]
+    if len(run) == 1:
+        return first
+    
+    # Recalculate duration over the extended window
+    duration = (end_epoch - start_epoch) / 60
+    total_removed = sum(d.totalPotionRemoved for d in run)
+    
+    return first._replace(
+        endTime=last.endTime,
+        endLevel=last.endLevel,
+        totalPotionRemoved=total_removed,
+        potionGeneratedDuringDrain=sum(d.potionGeneratedDuringDrain for d in run),
+        levelDrop=first.startLevel - last.endLevel,
+        duration=duration,
+        estimatedDrainRate=total_removed / duration if duration > 0 else 0,
+    )
+
 # Additional helper: Merge nearby drains that might be the same collection event
 def merge_nearby_drains(drain_events, max_gap_minutes=60):
     """
@@ -891,47 +1175,27 @@ def merge_nearby_drains(drain_events, max_gap_minutes=60):
     # Group by cauldron
     by_cauldron = defaultdict(list)
     for drain in drain_events:
-        by_cauldron[drain['cauldronId']].append(drain)
+        by_cauldron[drain.cauldronId].append(drain)
     
     merged = []
     
     for cid, drains in by_cauldron.items():
-        drains.sort(key=lambda d: d['startTime'])
+        drains.sort(key=attrgetter('startTime'))
         
         if not drains:
             continue
         
-        current_merge = drains[0].copy()
+        # Parse each endpoint once; a drain joins the previous one's run when
+        # it starts within max_gap_minutes of that drain's end
+        start_epochs = [iso_to_epoch(d.startTime) for d in drains]
+        end_epochs = [iso_to_epoch(d.endTime) for d in drains]
         
-        for i in range(1, len(drains)):
-            curr_end = datetime.fromisoformat(current_merge['endTime'].replace('Z', '+00:00'))
-            next_start = datetime.fromisoformat(drains[i]['startTime'].replace('Z', '+00:00'))
-            gap = (next_start - curr_end).total_seconds() / 60
-            
-            # If drains are within max_gap_minutes, merge them
-            if gap <= max_gap_minutes:
-                # Extend the current merge
-                current_merge['endTime'] = drains[i]['endTime']
-                current_merge['endLevel'] = drains[i]['endLevel']
-                current_merge['totalPotionRemoved'] += drains[i]['totalPotionRemoved']
-                current_merge['potionGeneratedDuringDrain'] += drains[i]['potionGeneratedDuringDrain']
-                current_merge['levelDrop'] = current_merge['startLevel'] - current_merge['endLevel']
-                
-                # Recalculate duration
-                new_start = datetime.fromisoformat(current_merge['startTime'].replace('Z', '+00:00'))
-                new_end = datetime.fromisoformat(current_merge['endTime'].replace('Z', '+00:00'))
-                current_merge['duration'] = (new_end - new_start).total_seconds() / 60
-                current_merge['estimatedDrainRate'] = (
-                    current_merge['totalPotionRemoved'] / current_merge['duration'] 
-                    if current_merge['duration'] > 0 else 0
-                )
-            else:
-                # Gap too large, save current and start new
-                merged.append(current_merge)
-                current_merge = drains[i].copy()
-        
-        # Add the last one
-        merged.append(current_merge)
+        run_start = 0
+        for i in range(1, len(drains) + 1):
+            if i < len(drains) and (start_epochs[i] - end_epochs[i - 1]) / 60 <= max_gap_minutes:
+                continue
+            merged.append(_merge_run(drains[run_start:i], start_epochs[run_start], end_epochs[i - 1]))
+            run_start = i
     
     return merged
 
@@ -940,118 +1204,73 @@ def estimate_fill_rate(entries):
     Estimate fill rate from periods of consistent level increase.
     Returns median fill rate in L/min.
     """
-    fill_rates = []
+    ts, lvl = _to_arrays(entries)
+    time_diff_min = np.diff(ts) / 60
+    level_change = np.diff(lvl)
     
-    for i in range(len(entries) - 1):
-        try:
-            curr = entries[i]
-            next_e = entries[i + 1]
-            
-            time_curr = datetime.fromisoformat(curr['timestamp'].replace('Z', '+00:00'))
-            time_next = datetime.fromisoformat(next_e['timestamp'].replace('Z', '+00:00'))
-            time_diff_min = (time_next - time_curr).total_seconds() / 60
-            
-            if time_diff_min <= 0 or time_diff_min > 5:
-                continue
-            
-            level_change = next_e['level'] - curr['level']
-            
-            # Only consider increases (filling periods)
-            if level_change > 0:
-                rate = level_change / time_diff_min
-                # Filter out unrealistic rates
-                if 0.01 < rate < 10:
-                    fill_rates.append(rate)
-                    
-        except:
-            continue
+    # Only consider increases (filling periods) over short gaps
+    rising = (time_diff_min > 0) & (time_diff_min <= 5) & (level_change > 0)
+    rates = level_change[rising] / time_diff_min[rising]
     
-    if not fill_rates:
+    # Filter out unrealistic rates
+    rates = rates[(rates > 0.01) & (rates < 10)]
+    
+    if not rates.size:
         return 0
     
-    return statistics.median(fill_rates)
+    return float(np.median(rates))
 
 
-def calculate_fill_rates(data, cauldron_id=None):
+def calculate_fill_rates(data, cauldron_id=None, index=None):
     """Calculate average fill rates for each cauldron"""
-    cauldron_data = defaultdict(list)
-    
-    for entry in data:
-        cid = entry.get('cauldronId')
-        if cauldron_id is None or cid == cauldron_id:
-            cauldron_data[cid].append(entry)
+    if index is None:
+        index = build_cauldron_index(data)
     
     fill_rates = {}
     
-    for cid, entries in cauldron_data.items():
-        entries.sort(key=lambda x: x.get('timestamp', ''))
-        rates = []
+    for cid, (_, ts, lvl) in index.items():
+        if cauldron_id is not None and cid != cauldron_id:
+            continue
         
-        for i in range(1, len(entries)):
-            prev = entries[i-1]
-            curr = entries[i]
-            change = curr.get('level', 0) - prev.get('level', 0)
-            
-            # Only consider increases
-            if change > 0:
-                try:
-                    prev_time = datetime.fromisoformat(prev['timestamp'].replace('Z', '+00:00'))
-                    curr_time = datetime.fromisoformat(curr['timestamp'].replace('Z', '+00:00'))
-                    time_diff = (curr_time - prev_time).total_seconds() / 60
-                    
-                    if time_diff > 0:
-                        rate = change / time_diff
-                        rates.append(rate)
-                except:
-                    continue
-        
-        if rates:
+        change = np.diff(lvl)
+        time_diff = np.diff(ts) / 60
+        
+        # Only consider increases
+        rising = (change > 0) & (time_diff > 0)
+        rates = change[rising] / time_diff[rising]
+        
+        if rates.size:
             fill_rates[cid] = {
-                "average": round(statistics.mean(rates), 3),
-                "median": round(statistics.median(rates), 3),
-                "min": round(min(rates), 3),
-                "max": round(max(rates), 3),
-                "samples": len(rates)
+                "average": round(float(rates.mean()), 3),
+                "median": round(float(np.median(rates)), 3),
+                "min": round(float(rates.min()), 3),
+                "max": round(float(rates.max()), 3),
+                "samples": int(rates.size)
             }
     
     return fill_rates
 
+# Discrepancy severities from least to most serious ("discrepancy" is the top level)
+SEVERITIES = ('low', 'medium', 'high', 'discrepancy')
+SEVERITY_RANK = {severity: rank for rank, severity in enumerate(SEVERITIES)}
+
+def _ticket_key(t):
+    """Ticket ID, or a synthetic key built from the ticket's properties if it has none"""
+    return (t.get('ticket_id') or t.get('id')
+            or f"{t.get('date', '')}_{t.get('cauldron_id', '')}_{t.get('amount_collected', 0)}_{t.get('courier_id', '')}")
+
 def annotate_tickets_with_discrepancies(tickets, discrepancies):
     """
     Annotate individual tickets with their specific discrepancy information.
     Now works with granular ticket-to-drain matching.
     """
-    # Create a lookup for tickets by ID (or by unique key if no ID)
-    ticket_lookup = {}
-    for t in tickets:
-        # Create unique key for ticket
-        ticket_id = t.get('ticket_id') or t.get('id')
-        if not ticket_id:
-            # Create synthetic ID from ticket properties
-            date = t.get('date', '')
-            cauldron = t.get('cauldron_id', '')
-            amount = t.get('amount_collected', 0)
-            courier = t.get('courier_id', '')
-            ticket_id = f"{date}_{cauldron}_{amount}_{courier}"
-        
-        ticket_lookup[ticket_id] = t
-    
     # Map discrepancies to tickets
     ticket_discrepancies = {}
     
     for disc in discrepancies:
         if 'ticket' in disc:
             # Get the ticket from the discrepancy
-            ticket_data = disc['ticket']
-            ticket_id = ticket_data.get('ticket_id') or ticket_data.get('id')
-            
-            if not ticket_id:
-                # Create same synthetic ID
-                date = ticket_data.get('date', '')
-                cauldron = ticket_data.get('cauldron_id', '')
-                amount = ticket_data.get('amount_collected', 0)
-                courier = ticket_data.get('courier_id', '')
-                ticket_id = f"{date}_{cauldron}_{amount}_{courier}"
+            ticket_id = _ticket_key(disc['ticket'])
             
             if ticket_id not in ticket_discrepancies:
                 ticket_discrepancies[ticket_id] = []
@@ -1061,52 +1280,36 @@ def annotate_tickets_with_discrepancies(tickets, discrepancies):
     annotated = []
     
     for ticket in tickets:
-        t_copy = dict(ticket)
-        
-        # Get ticket ID
-        ticket_id = t_copy.get('ticket_id') or t_copy.get('id')
-        if not ticket_id:
-            date = t_copy.get('date', '')
-            cauldron = t_copy.get('cauldron_id', '')
-            amount = t_copy.get('amount_collected', 0)
-            courier = t_copy.get('courier_id', '')
-            ticket_id = f"{date}_{cauldron}_{amount}_{courier}"
-        
         # Check if this ticket has any discrepancies
-        ticket_discs = ticket_discrepancies.get(ticket_id, [])
+        ticket_discs = ticket_discrepancies.get(_ticket_key(ticket), [])
         
         if not ticket_discs:
             # Clean ticket
-            t_copy['is_suspicious'] = False
-            t_copy['suspicion_type'] = None
-            t_copy['suspicion_severity'] = None
-            t_copy['suspicion_message'] = None
-            t_copy['linked_drain_events'] = []
-        else:
-            # Has discrepancies
-            t_copy['is_suspicious'] = True
-            
-            # Combine info from all discrepancies for this ticket
-            types = [d['type'] for d in ticket_discs]
-            severities = [d['severity'] for d in ticket_discs]
-            messages = [d['message'] for d in ticket_discs]
-            drains = []
-            
-            for d in ticket_discs:
-                if 'drainEvent' in d:
-                    drains.append(d['drainEvent'])
-            
-            # Use highest severity
-            severity_order = {'discrepancy': 3, 'high': 2, 'medium': 1, 'low': 0}
-            max_severity = max(severities, key=lambda s: severity_order.get(s, 0))
-            
-            t_copy['suspicion_type'] = types[0] if len(types) == 1 else "MULTIPLE_ISSUES"
-            t_copy['suspicion_severity'] = max_severity
-            t_copy['suspicion_message'] = " | ".join(messages)
-            t_copy['linked_drain_events'] = drains
-            t_copy['discrepancy_details'] = ticket_discs  # Include full details
+            annotated.append({
+                **ticket,
+                'is_suspicious': False,
+                'suspicion_type': None,
+                'suspicion_severity': None,
+                'suspicion_message': None,
+                'linked_drain_events': [],
+            })
+            continue
         
-        annotated.append(t_copy)
+        # Has discrepancies: combine info from all of them
+        types = [d['type'] for d in ticket_discs]
+        
+        # Use highest severity
+        max_severity = SEVERITIES[max(SEVERITY_RANK.get(d['severity'], 0) for d in ticket_discs)]
+        
+        annotated.append({
+            **ticket,
+            'is_suspicious': True,
+            'suspicion_type': types[0] if len(types) == 1 else "MULTIPLE_ISSUES",
+            'suspicion_severity': max_severity,
+            'suspicion_message': " | ".join(d['message'] for d in ticket_discs),
+            'linked_drain_events': [d['drainEvent'] for d in ticket_discs if 'drainEvent' in d],
+            'discrepancy_details': ticket_discs,  # Include full details
+        })
     
     return annotated
 
@@ -1118,66 +1321,65 @@ def find_discrepancies(drain_events, tickets, threshold=0.15):
     """
     discrepancies = []
     
-    # Group drains and tickets by date and cauldron
+    # Group drains and tickets by date and cauldron, totalling volumes as we go
     drains_by_key = {}
     tickets_by_key = {}
+    drain_totals = {}
+    ticket_totals = {}
     
     for drain in drain_events:
-        date = drain['startTime'].split('T')[0]
-        cauldron = drain['cauldronId']
-        key = f"{date}_{cauldron}"
-        if key not in drains_by_key:
-            drains_by_key[key] = []
-        drains_by_key[key].append(drain)
+        key = (drain.date, drain.cauldronId)
+        drains_by_key.setdefault(key, []).append(drain)
+        drain_totals[key] = drain_totals.get(key, 0) + drain.totalPotionRemoved
     
     for ticket in tickets:
-        date = ticket.get('date', '').split('T')[0]
-        cauldron = ticket.get('cauldron_id', '')
-        key = f"{date}_{cauldron}"
-        if key not in tickets_by_key:
-            tickets_by_key[key] = []
-        tickets_by_key[key].append(ticket)
+        key = (ticket.get('date', '').split('T')[0], ticket.get('cauldron_id', ''))
+        tickets_by_key.setdefault(key, []).append(ticket)
+        ticket_totals[key] = ticket_totals.get(key, 0) + ticket.get('amount_collected', 0)
     
     # Process each day/cauldron combination
-    all_keys = set(drains_by_key.keys()) | set(tickets_by_key.keys())
+    all_keys = drains_by_key.keys() | tickets_by_key.keys()
     
     for key in all_keys:
-        date, cauldron_id = key.split('_', 1)
+        date, cauldron_id = key
         drains = drains_by_key.get(key, [])
         tickets_list = tickets_by_key.get(key, [])
         
-        # Calculate total volumes for the day
-        total_ticket_volume = sum(t.get('amount_collected', 0) for t in tickets_list)
-        total_drain_volume = sum(d['totalPotionRemoved'] for d in drains)
+        # Total volumes for the day
+        total_ticket_volume = ticket_totals.get(key, 0)
+        total_drain_volume = drain_totals.get(key, 0)
         
         # Strategy: Compare daily totals first, then do individual matching
         if len(tickets_list) == 0 and len(drains) > 0:
             # Drains but no tickets
             for drain in drains:
-                if drain['totalPotionRemoved'] > 20:  # Only flag significant drains
+                if drain.totalPotionRemoved > 20:  # Only flag significant drains
+                    drain_volume = round(drain.totalPotionRemoved, 2)
                     discrepancies.append({
                         "type": "UNLOGGED_DRAIN",
                         "severity": "high",
                         "cauldronId": cauldron_id,
                         "date": date,
                         "drainEvent": drain,
-                        "drainVolume": round(drain['totalPotionRemoved'], 2),
-                        "message": f"Drain of {round(drain['totalPotionRemoved'], 2)}L detected but no ticket found"
+                        "drainVolume": drain_volume,
+                        "message": f"Drain of {drain_volume}L detected but no ticket found"
                     })
             continue
         
         if len(drains) == 0 and len(tickets_list) > 0:
             # Tickets but no drains
             for ticket in tickets_list:
-                if ticket.get('amount_collected', 0) > 10:  # Only flag significant amounts
+                amount = ticket.get('amount_collected', 0)
+                if amount > 10:  # Only flag significant amounts
+                    ticket_volume = round(amount, 2)
                     discrepancies.append({
                         "type": "PHANTOM_TICKET",
                         "severity": "discrepancy",
                         "cauldronId": cauldron_id,
                         "date": date,
                         "ticket": ticket,
-                        "ticketVolume": round(ticket.get('amount_collected', 0), 2),
-                        "message": f"Ticket claims {round(ticket.get('amount_collected', 0), 2)}L but no drain detected"
+                        "ticketVolume": ticket_volume,
+                        "message": f"Ticket claims {ticket_volume}L but no drain detected"
                     })
             continue
         
@@ -1185,99 +1387,56 @@ def find_discrepancies(drain_events, tickets, threshold=0.15):
         volume_diff = abs(total_ticket_volume - total_drain_volume)
         percent_diff = (volume_diff / total_drain_volume * 100) if total_drain_volume > 0 else 999
         
-        # If daily totals match reasonably well, don't flag individual tickets
+        # If daily totals match reasonably well, don't flag individual tickets:
+        # the day balances out
         if percent_diff <= 20:
-            # Totals are close enough - this is good
-            # Only flag if there's a MAJOR individual outlier
-            
-            # Sort both by volume for comparison
-            drains_sorted = sorted(drains, key=lambda d: d['totalPotionRemoved'], reverse=True)
-            tickets_sorted = sorted(tickets_list, key=lambda t: t.get('amount_collected', 0), reverse=True)
-            
-            # Do simple greedy matching
-            matched_drains = set()
-            matched_tickets = set()
-            
-            for t_idx, ticket in enumerate(tickets_sorted):
-                ticket_vol = ticket.get('amount_collected', 0)
-                best_match = None
-                best_diff = float('inf')
-                
-                for d_idx, drain in enumerate(drains_sorted):
-                    if d_idx in matched_drains:
-                        continue
-                    
-                    drain_vol = drain['totalPotionRemoved']
-                    diff = abs(ticket_vol - drain_vol)
-                    diff_percent = (diff / drain_vol * 100) if drain_vol > 0 else 999
-                    
-                    # Accept match if within 25% tolerance
-                    if diff_percent <= 25 and diff < best_diff:
-                        best_match = d_idx
-                        best_diff = diff
-                
-                if best_match is not None:
-                    matched_drains.add(best_match)
-                    matched_tickets.add(t_idx)
-            
-            # Don't flag anything - the day balances out
             continue
         
+        # Daily totals DON'T match - flag the discrepancy
+        severity = "discrepancy" if percent_diff > 50 else "high" if percent_diff > 30 else "medium"
+        
+        ticket_total = round(total_ticket_volume, 2)
+        drain_total = round(total_drain_volume, 2)
+        
+        if total_ticket_volume > total_drain_volume:
+            # More tickets than drains - possible fraud
+            disc_type = "DAILY_VOLUME_EXCESS"
+            message = f"Tickets claim {ticket_total}L but only {drain_total}L drained ({round(percent_diff, 1)}% over)"
         else:
-            # Daily totals DON'T match - flag the discrepancy
-            severity = "discrepancy" if percent_diff > 50 else "high" if percent_diff > 30 else "medium"
-            
-            if total_ticket_volume > total_drain_volume:
-                # More tickets than drains - possible fraud
-                discrepancies.append({
-                    "type": "DAILY_VOLUME_EXCESS",
-                    "severity": severity,
-                    "cauldronId": cauldron_id,
-                    "date": date,
-                    "tickets": tickets_list,
-                    "drainEvents": drains,
-                    "totalTicketVolume": round(total_ticket_volume, 2),
-                    "totalDrainVolume": round(total_drain_volume, 2),
-                    "difference": round(volume_diff, 2),
-                    "percentDifference": round(percent_diff, 2),
-                    "message": f"Tickets claim {round(total_ticket_volume, 2)}L but only {round(total_drain_volume, 2)}L drained ({round(percent_diff, 1)}% over)"
-                })
-            else:
-                # More drains than tickets - possible unlogged collection
-                discrepancies.append({
-                    "type": "DAILY_VOLUME_SHORTAGE",
-                    "severity": severity,
-                    "cauldronId": cauldron_id,
-                    "date": date,
-                    "tickets": tickets_list,
-                    "drainEvents": drains,
-                    "totalTicketVolume": round(total_ticket_volume, 2),
-                    "totalDrainVolume": round(total_drain_volume, 2),
-                    "difference": round(volume_diff, 2),
-                    "percentDifference": round(percent_diff, 2),
-                    "message": f"Only {round(total_ticket_volume, 2)}L ticketed but {round(total_drain_volume, 2)}L drained ({round(percent_diff, 1)}% under)"
-                })
+            # More drains than tickets - possible unlogged collection
+            disc_type = "DAILY_VOLUME_SHORTAGE"
+            message = f"Only {ticket_total}L ticketed but {drain_total}L drained ({round(percent_diff, 1)}% under)"
+        
+        discrepancies.append({
+            "type": disc_type,
+            "severity": severity,
+            "cauldronId": cauldron_id,
+            "date": date,
+            "tickets": tickets_list,
+            "drainEvents": drains,
+            "totalTicketVolume": ticket_total,
+            "totalDrainVolume": drain_total,
+            "difference": round(volume_diff, 2),
+            "percentDifference": round(percent_diff, 2),
+            "message": message
+        })
     
     return discrepancies
 
-def predict_overflow(data, cauldrons, fill_rates, hours_ahead=24):
+def predict_overflow(data, cauldrons, fill_rates, hours_ahead=24, index=None):
     """
     Predict when cauldrons will reach capacity
     """
     predictions = []
+    if index is None:
+        index = build_cauldron_index(data)
     
     # Create cauldron lookup
     cauldron_map = {c['id']: c for c in cauldrons}
     
-    # Get latest data point for each cauldron
-    latest_data = {}
-    for entry in data:
-        cid = entry['cauldronId']
-        timestamp = entry['timestamp']
-        if cid not in latest_data or timestamp > latest_data[cid]['timestamp']:
-            latest_data[cid] = entry
-    
-    for cid, latest in latest_data.items():
+    for cid, series in index.items():
+        # Latest data point for the cauldron
+        latest = series.entries[-1]
         if cid not in cauldron_map or cid not in fill_rates:
             continue
         
@@ -1293,27 +1452,26 @@ def predict_overflow(data, cauldrons, fill_rates, hours_ahead=24):
             hours_to_full = minutes_to_full / 60
             
             if hours_to_full <= hours_ahead:
-                try:
-                    current_time = datetime.fromisoformat(latest['timestamp'].replace('Z', '+00:00'))
-                    overflow_time = current_time + timedelta(minutes=minutes_to_full)
-                    
-                    predictions.append({
-                        "cauldronId": cid,
-                        "cauldronName": cauldron.get('name', cid),
-                        "currentLevel": round(current_level, 2),
-                        "maxVolume": max_volume,
-                        "fillRate": round(fill_rate, 3),
-                        "hoursToFull": round(hours_to_full, 2),
-                        "estimatedOverflowTime": overflow_time.isoformat(),
-                        "urgency": "discrepancy" if hours_to_full < 4 else "high" if hours_to_full < 12 else "medium"
-                    })
-                except:
-                    continue
+                current_time = parse_iso(latest['timestamp'])
+                overflow_time = current_time + timedelta(minutes=minutes_to_full)
+                
+                predictions.append({
+                    "cauldronId": cid,
+                    "cauldronName": cauldron.get('name', cid),
+                    "currentLevel": round(current_level, 2),
+                    "maxVolume": max_volume,
+                    "fillRate": round(fill_rate, 3),
+                    "hoursToFull": round(hours_to_full, 2),
+                    "estimatedOverflowTime": overflow_time.isoformat(),
+                    "urgency": "discrepancy" if hours_to_full < 4 else "high" if hours_to_full < 12 else "medium"
+                })
     
     # Sort by urgency
-    predictions.sort(key=lambda x: x['hoursToFull'])
+    predictions.sort(key=itemgetter('hoursToFull'))
     
     return predictions
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    # Development server only; see README for running under gunicorn
+    logging.basicConfig(level=logging.INFO)
+    app.run()